@@ -5,8 +5,106 @@ ID3 algo for building decision trees.
 
 author: vikash.madhow@gatech.edu
 """
+from array import array
+from collections import deque
 from math import log2
 
+# log2(k) for every integer k from 0 up to the size of the largest dataset seen so far (log2(0)
+# is taken as 0), so that entropy can be computed from integer counts with table lookups only.
+_LOG2 = [0.0]
+
+
+def _grow_log2_table(size):
+    """Extends the log2 lookup table to cover all integers up to size."""
+    if size >= len(_LOG2):
+        _LOG2.extend(log2(k) for k in range(len(_LOG2), size + 1))
+
+
+def _entropy(class_counts, total):
+    """
+    Computes the entropy of a set of total rows distributed over the classification values as per
+    class_counts. This uses the equivalent form over the integer counts,
+    H = log2(N) - sum(n_i * log2(n_i)) / N, with log2 read from the lookup table.
+    """
+    if total == 0:
+        return 0.0
+
+    weighted = 0.0
+    for count in class_counts:
+        weighted += count * _LOG2[count]
+    return max(0.0, _LOG2[total] - weighted / total)
+
+
+# the information-gain kernels specialised (by _ig_kernel) for each pair of attribute and classification arities
+_IG_KERNELS = {}
+
+
+def _ig_kernel_source(attr_arity, class_arity):
+    """
+    Generates the source of the information-gain kernel specialised for attributes with attr_arity
+    values and class_arity classification values, with all loops over values unrolled (see _ig_kernel).
+    """
+    last_code = attr_arity - 1
+    counted = [f"c{value}_{c}" for value in range(last_code) for c in range(class_arity)]
+    lines = [f"def _ig_kernel_{attr_arity}_{class_arity}(attr_col, class_col, idx, class_counts, parent_entropy, log2_table):",
+             "    total = len(idx)",
+             "    if total == 0:",
+             "        return 0"]
+    if counted:
+        lines += [f"    counts = [0] * {len(counted)}",
+                  "    for i in idx:",
+                  "        attr_code = attr_col[i]",
+                  f"        if attr_code != {last_code}:",
+                  f"            counts[attr_code * {class_arity} + class_col[i]] += 1",
+                  f"    {', '.join(counted)}, = counts"]
+    for c in range(class_arity):
+        lines.append(f"    c{last_code}_{c} = class_counts[{c}]" + "".join(f" - c{value}_{c}" for value in range(last_code)))
+
+    terms = []
+    for value in range(attr_arity):
+        lines.append(f"    n{value} = " + " + ".join(f"c{value}_{c}" for c in range(class_arity)))
+        terms.append(f"+ n{value} * log2_table[n{value}]")
+        terms += [f"- c{value}_{c} * log2_table[c{value}_{c}]" for c in range(class_arity)]
+    lines.append("    weighted = " + " ".join(terms)[2:])
+    lines.append("    return parent_entropy - weighted / total")
+    return "\n".join(lines) + "\n"
+
+
+def _ig_kernel(attr_arity, class_arity):
+    """
+    Returns the kernel computing the information gain, with respect to an attribute with attr_arity
+    values, of the rows at some indices. The kernel is called with the attribute and classification
+    value code columns, the indices, the class counts and entropy of the rows, and the log2 table.
+
+    The weighted entropy of the subset for each attribute value v is accumulated as
+    n_v * H_v = n_v * log2(n_v) - sum(n_vc * log2(n_vc)), from the counts of the rows per value and
+    class. The rows having the last value of the attribute are not counted: their class counts are
+    what remains of the class counts of all the rows once those of the other values are subtracted.
+
+    The kernel is generated and compiled on first use for each pair of arities, with the counts held
+    in local variables and the sums over values and classes written out as straight-line code.
+    """
+    kernel = _IG_KERNELS.get((attr_arity, class_arity))
+    if kernel is None:
+        namespace = {}
+        exec(compile(_ig_kernel_source(attr_arity, class_arity), f"<ig-kernel-{attr_arity}-{class_arity}>", "exec"),
+             namespace)
+        kernel = namespace[f"_ig_kernel_{attr_arity}_{class_arity}"]
+        _IG_KERNELS[attr_arity, class_arity] = kernel
+    return kernel
+
+
+def _gains_kernel(cols, class_col, idx, candidates, arities, class_arity, class_counts):
+    """
+    Computes the information gain of the rows at the supplied indices for each of the candidate
+    attributes (given as indices into cols and arities), returning them as a list in the same order.
+    The gains are independent of one another; the entropy of the rows is computed once for all of them.
+    """
+    parent_entropy = _entropy(class_counts, len(idx))
+    return [_ig_kernel(arities[attr_index], class_arity)(cols[attr_index], class_col, idx, class_counts,
+                                                         parent_entropy, _LOG2)
+            for attr_index in candidates]
+
 
 class Attribute:
     """
@@ -29,19 +127,29 @@ class Dataset:
     """
     A dataset is a list of tuples, all of which conforms to a structure defined on construction
     of the dataset. The structure consist of an ordered-list of attributes (the fields of the dataset).
+
+    The rows are also stored column-wise, each value being encoded as its position in a stable ordering
+    of the values of its attribute. Subsets of the dataset (such as those produced when splitting on an
+    attribute while building the decision tree) are then simply lists of indices into those columns.
     """
     def __init__(self, attributes, classification_attribute, rows=None):
         self.attributes = attributes
         self.attribute_by_name = {attr.name:index for index, attr in attributes.items()}
 
-        # A cache of datasets produced by selecting part of this dataset
-        self._sub_dataset_cache = {}
-
         self.rows = []
         self.class_attr = classification_attribute
         self.class_attr_index = self.attribute_by_name[self.class_attr.name]
-        self.attr_values_count = {index:{value:0 for value in attr.values} for index, attr in self.attributes.items()}
-        self.rows_by_attr_value = {index:{value:[] for value in attr.values} for index, attr in self.attributes.items()}
+
+        # the encoding of the values of each attribute and the encoded columns
+        self.values_by_code = {index:tuple(attr.values) for index, attr in self.attributes.items()}
+        self.code_maps = {index:{value:code for code, value in enumerate(values)}
+                          for index, values in self.values_by_code.items()}
+        self.cols = {index:array('h') for index in self.attributes}
+        self._arities = {index:len(values) for index, values in self.values_by_code.items()}
+
+        # running counts of the classification values, indexed by their codes
+        self._class_values = self.values_by_code[self.class_attr_index]
+        self._class_counts = [0] * len(self._class_values)
 
         if rows is not None:
             self.add(*rows)
@@ -51,29 +159,29 @@ class Dataset:
         Add one or more rows to the dataset.
         :param rows: The rows to add.
         """
-        # type-check and increment counts for each value
-        value_counts = {index:{value:0 for value in attr.values} for index, attr in self.attributes.items()}
-        rows_by_attr_value = {index:{value:[] for value in attr.values} for index, attr in self.attributes.items()}
-
-        for row in rows:
-            for attr_index, attr in self.attributes.items():
-                attr_value = row[attr_index]
-                attr.type_check(attr_value)
-                value_counts[attr_index][attr_value] += 1
-                rows_by_attr_value[attr_index][attr_value].append(row)
-
-        # update counts
-        for attr_index, value_count in value_counts.items():
-            for value, count in value_count.items():
-                self.attr_values_count[attr_index][value] += count
-
-        # update rows by attribute values
-        for attr_index, rows_by_value in rows_by_attr_value.items():
-            for value, rs in rows_by_value.items():
-                self.rows_by_attr_value[attr_index][value] += rs
+        # encode the rows column by column, values not acceptable for their attribute being
+        # encoded as -1; the columns are only updated once all of them have been checked
+        encoded = {}
+        for attr_index, attr in self.attributes.items():
+            code_map = self.code_maps[attr_index]
+            codes = [code_map.get(row[attr_index], -1) for row in rows]
+            if -1 in codes:
+                attr.type_check(rows[codes.index(-1)][attr_index])
+            encoded[attr_index] = codes
+
+        for attr_index, codes in encoded.items():
+            self.cols[attr_index].extend(codes)
+
+        class_counts = self._class_counts
+        for code in encoded[self.class_attr_index]:
+            class_counts[code] += 1
 
         self.rows += rows
+        _grow_log2_table(len(self.rows))
 
+    def _all_rows(self):
+        """The subset of all the rows of the dataset, as indices."""
+        return range(len(self.rows))
 
     def non_classifying_attributes(self):
         """Returns a map of all attributes of the dataset minus the classifying one."""
@@ -84,81 +192,108 @@ class Dataset:
 
     def entropy(self):
         """Computes the entropy of the dataset."""
-        ent = 0.0
-        for value in self.class_attr.values:
-            if len(self.rows) != 0:
-                proportion = self.attr_values_count[self.class_attr_index][value] / len(self.rows)
-                if proportion != 0:
-                    ent -= proportion * log2(proportion)
-        return ent
+        return _entropy(self._class_counts, len(self.rows))
 
     def information_gain(self, attribute):
         """Computes the information gain for the dataset with respect to the specified attribute."""
-        if len(self.rows) == 0:
-            return 0
+        return self._gains(self._all_rows(), (self.attribute_by_name[attribute.name],), self._class_counts)[0]
+
+    def _gains(self, subset, candidates, class_counts):
+        """
+        Computes the information gain of the subset of the dataset (see _all_rows), whose class
+        counts are given, for each of the candidate attribute indices.
+        """
+        return _gains_kernel(self.cols, self.cols[self.class_attr_index], subset, candidates,
+                             self._arities, len(self._class_values), class_counts)
 
-        else:
-            ent = 0.0
-            for value in attribute.values:
-                dataset = self.select(attribute, value)
-                ent += len(dataset) / len(self.rows) * dataset.entropy()
-            return self.entropy() - ent
+    def _split(self, subset, attr_index, class_counts):
+        """
+        Splits the subset of the dataset (see _all_rows), whose class counts are given, on the attribute
+        at attr_index, counting the classification values of each split along the way. The rows of
+        the last split are not counted, their class counts being derived by subtraction.
+        :return: The list of subsets for each value code of the attribute and the list of their class counts.
+        """
+        attr_col = self.cols[attr_index]
+        class_col = self.cols[self.class_attr_index]
+        splits = [[] for _ in self.values_by_code[attr_index]]
+        split_class_counts = [[0] * len(class_counts) for _ in splits]
+        last_code = len(splits) - 1
+        for i in subset:
+            attr_code = attr_col[i]
+            splits[attr_code].append(i)
+            if attr_code != last_code:
+                split_class_counts[attr_code][class_col[i]] += 1
+
+        last_class_counts = split_class_counts[last_code]
+        for class_code, count in enumerate(class_counts):
+            last_class_counts[class_code] = count - sum(counts[class_code] for counts in split_class_counts[:last_code])
+        return splits, split_class_counts
 
     def select(self, attribute, value):
         """Returns a subset of the dataset for which the attribute has the specified value."""
         attr_index = self.attribute_by_name[attribute.name]
-        sub_datasets = self._sub_dataset_cache.setdefault(attr_index, dict())
-        selected = sub_datasets.setdefault(value, None)
-        if selected is None:
-            rows = self.rows_by_attr_value[attr_index][value]
-            selected = Dataset(self.attributes, self.class_attr, rows)
-            sub_datasets[value] = selected
-
-        return selected
+        code = self.code_maps[attr_index][value]
+        selected = [i for i, c in enumerate(self.cols[attr_index]) if c == code]
+
+        # the rows have already been checked and encoded so the columns are copied over directly
+        dataset = Dataset(self.attributes, self.class_attr)
+        dataset.rows = [self.rows[i] for i in selected]
+        for index, col in self.cols.items():
+            dataset.cols[index].extend(col[i] for i in selected)
+        for code in dataset.cols[self.class_attr_index]:
+            dataset._class_counts[code] += 1
+        return dataset
 
     def decision_tree(self):
         """
-        Computes the decision tree for this dataset.
+        Computes the decision tree for this dataset. The tree is built iteratively from a stack
+        of pending nodes, each being a subset of the dataset (see _all_rows, with their class
+        counts) and the attributes it may still be split on, as a bitmask of their indices; every
+        node is placed into its parent (by key) as soon as it is created, to be filled in when its
+        children are popped.
         :return: The decision tree.
         """
-
-        # if all examples has the same classification value, return that value as the target node value
-        number_of_rows = len(self.rows)
-        for value in self.attributes[self.class_attr_index].values:
-            if self.attr_values_count[self.class_attr_index][value] == number_of_rows:
-                return Leaf(value)
-
-        # if there are no more attributes, simply return the most common value of the classification
-        # attribute as the classification value
-        attributes = self.non_classifying_attributes()
-        value_counts = self.attr_values_count[self.class_attr_index]
-        most_common_classifying_value = max(value_counts.keys(), key=lambda k: value_counts[k])
-        if len(attributes) == 0:
-            return Leaf(most_common_classifying_value)
-
-        else:
-            attr_gain = {index:self.information_gain(attr) for index, attr in attributes.items()}
-            attr_index_max_gain = max(attr_gain.keys(), key=(lambda k: attr_gain[k]))
-
-            attribute = attributes[attr_index_max_gain]
-            value_to_node = dict()
-            for value in attribute.values:
-                selected_rows = self.select(attribute, value)
-                if len(selected_rows) == 0:
-                    value_to_node[value] = Leaf(most_common_classifying_value)
-                else:
-                    if attr_index_max_gain in selected_rows.attributes:
-                        del selected_rows.attributes[attr_index_max_gain]
-
-                    if attribute.name in selected_rows.attribute_by_name:
-                        del selected_rows.attribute_by_name[attribute.name]
-
-                    if attr_index_max_gain in selected_rows.attr_values_count:
-                        del selected_rows.attr_values_count[attr_index_max_gain]
-
-                    value_to_node[value] = selected_rows.decision_tree()
-
-            return Decision(attribute, value_to_node)
+        attributes = 0
+        for attr_index in self.non_classifying_attributes():
+            attributes |= 1 << attr_index
+
+        root = [None]
+        pending = deque([(root, 0, self._all_rows(), attributes, self._class_counts)])
+        while pending:
+            parent, key, subset, attributes, class_counts = pending.pop()
+
+            # if all examples has the same classification value (the only non-zero class count), that
+            # value, which is also the most common one, is the target node value. Likewise, if there are
+            # no more attributes, simply return the most common value of the classification attribute
+            # as the classification value
+            most_common_classifying_value = self._class_values[class_counts.index(max(class_counts))]
+            if class_counts.count(0) >= len(class_counts) - 1 or attributes == 0:
+                parent[key] = Leaf(most_common_classifying_value)
+
+            else:
+                candidates = []
+                remaining = attributes
+                while remaining:
+                    lowest = remaining & -remaining
+                    candidates.append(lowest.bit_length() - 1)
+                    remaining ^= lowest
+
+                gains = self._gains(subset, candidates, class_counts)
+                attr_index_max_gain = candidates[gains.index(max(gains))]
+
+                remaining_attributes = attributes & ~(1 << attr_index_max_gain)
+                values = self.values_by_code[attr_index_max_gain]
+                value_to_node = dict.fromkeys(values)
+                splits, split_class_counts = self._split(subset, attr_index_max_gain, class_counts)
+                for code, selected in enumerate(splits):
+                    if not selected:
+                        value_to_node[values[code]] = Leaf(most_common_classifying_value)
+                    else:
+                        pending.append((value_to_node, values[code], selected, remaining_attributes, split_class_counts[code]))
+
+                parent[key] = Decision(self.attributes[attr_index_max_gain], value_to_node)
+
+        return root[0]
 
     def classify(self, row):
         """Classifies a row based on the trained decision tree (not implemented yet)."""
@@ -24,7 +24,6 @@ class Graph:
         """
         # ensure that all nodes have a key-entry in the node-map.
         self._directed = directed
-        self._incoming_edges = {}
         self._outgoing_edges = dict(outgoing_edges)
         for edges in outgoing_edges.values():
             for edge in edges:
@@ -36,6 +35,13 @@ class Graph:
                 for edge in edges:
                     self._outgoing_edges.setdefault(edge.node, set()).add(edge.__class__(tail, edge.weight))
 
+        # the inverse adjacency list, mapping each node to its incoming edges, kept
+        # up-to-date by all methods modifying the graph.
+        self._incoming_edges = {node:set() for node in self._outgoing_edges}
+        for tail, edges in self._outgoing_edges.items():
+            for edge in edges:
+                self._incoming_edges[edge.node].add(FromHalfEdge(tail, edge.weight))
+
     @staticmethod
     def edges_from_node_to_targets(node_to_targets):
         """
@@ -94,10 +100,9 @@ class Graph:
 
     def incoming_edges(self, node):
         """
-        Returns the set of incoming edges for the node. This is an O(n) operation for
-        directed graphs where n is the number of nodes in the graph as the adjacency
-        list only keeps outgoing edges from a node. The incoming edges have to be built
-        by scanning the node map. For undirected graphs, this is the same as outgoing_edges.
+        Returns the set of incoming edges for the node. These are kept in an inverse
+        adjacency list maintained along with the outgoing edges whenever the graph is
+        modified. For undirected graphs, this is the same as outgoing_edges.
 
         :param node: The node whose incoming edges are being sought.
         :return: The incoming edges for the node.
@@ -140,28 +145,45 @@ class Graph:
         :param outgoing_edges: The outgoing edges from the node. Default is None.
         """
         outgoing_edges = set() if outgoing_edges is None else outgoing_edges
+
+        # the outgoing edges of an existing node are replaced, along with their mirrored
+        # edges in undirected graphs.
+        e = HalfEdge(node)
+        for edge in list(self._outgoing_edges.get(node, ())):
+            self._incoming_edges[edge.node].discard(e)
+            if not self.directed:
+                self._outgoing_edges[edge.node].discard(e)
+                self._incoming_edges[node].discard(HalfEdge(edge.node))
+
         self._outgoing_edges[node] = outgoing_edges
+        self._incoming_edges.setdefault(node, set())
+        for edge in outgoing_edges:
+            self._outgoing_edges.setdefault(edge.node, set())
+            self._incoming_edges.setdefault(edge.node, set()).add(FromHalfEdge(node, edge.weight))
+
         if not self.directed:
-            for edges in outgoing_edges.items():
-                for edge in edges:
-                    self._outgoing_edges.setdefault(edge.node, set()).add(edge.__class__(node, edge.weight))
+            for edge in outgoing_edges:
+                self._outgoing_edges[edge.node].add(edge.__class__(node, edge.weight))
+                self._incoming_edges[node].add(FromHalfEdge(edge.node, edge.weight))
 
     def remove_node(self, node):
         """
         Removes the node from the graph.
         :param node: The node to remove.
         """
-        if node in self._outgoing_edges:
-            del self._outgoing_edges[node]
-
-        if node in self._incoming_edges:
-            del self._incoming_edges[node]
-
+        # only the nodes adjacent to the removed node are visited: its targets, to remove it from their
+        # incoming edges, and its sources (from the inverse adjacency list), to remove it from their
+        # outgoing edges. This covers the mirrored edges of undirected graphs as well.
         e = HalfEdge(node)
-        for node_to_edges in [self._outgoing_edges, self._incoming_edges]:
-            for node, edges in node_to_edges.items():
-                if e in edges:
-                    edges.remove(e)
+        for edge in self._outgoing_edges.pop(node, ()):
+            incoming = self._incoming_edges.get(edge.node)
+            if incoming is not None:
+                incoming.discard(e)
+
+        for edge in self._incoming_edges.pop(node, ()):
+            outgoing = self._outgoing_edges.get(edge.node)
+            if outgoing is not None:
+                outgoing.discard(e)
 
     def remove_edge(self, from_node, to_node):
         """
@@ -200,29 +222,22 @@ class Graph:
 
     def __incoming_edges(self, node):
         """Internal method to compute the incoming edges."""
-        if node not in self._incoming_edges:
-            incoming_set = set()
-            for tail, edges in self._outgoing_edges.items():
-                for edge in edges:
-                    if edge.node == node:
-                        incoming_set.add(FromHalfEdge(tail, edge.weight))
-            self._incoming_edges[node] = incoming_set
-        return self._incoming_edges[node]
+        return self._incoming_edges.get(node, set())
 
     def to_graph_viz(self):
         """Produces a GraphViz representation of this graph in the DOT language."""
-        spec = ("digraph" if self.directed else "graph") + " {\n"
-        for node in self.nodes:
-            if len(self.outgoing_edges(node)) > 0:
-                for edge in self.outgoing_edges(node):
-                    spec += '    "' + str(node) + '"' + (" -> " if self.directed else " -- ") + \
-                            '"' + str(edge.node) + '"' + \
-                            ("" if edge.weight is None else '[label="' + str(edge.weight) + '"]') + \
-                            ";\n"
+        # the spec is built as a list of fragments joined once at the end
+        spec = ["digraph {\n" if self.directed else "graph {\n"]
+        arrow = " -> " if self.directed else " -- "
+        for node, edges in self._outgoing_edges.items():
+            if len(edges) > 0:
+                for edge in edges:
+                    label = "" if edge.weight is None else f'[label="{edge.weight}"]'
+                    spec.append(f'    "{node}"{arrow}"{edge.node}"{label};\n')
             else:
-                spec += '    "' + str(node) + '";\n'
-        spec += "}"
-        return spec
+                spec.append(f'    "{node}";\n')
+        spec.append("}")
+        return "".join(spec)
 
     def __str__(self):
         return self.to_graph_viz()
@@ -234,12 +249,8 @@ class Graph:
         return self is other or self._outgoing_edges == other._outgoing_edges
 
     def __hash__(self):
-        h = 13
-        for node, edges in self._outgoing_edges:
-            h = 31 * h + hash(node)
-            for edge in edges:
-                h = 31 * h + hash(edge)
-        return h
+        # order-independent, as for equality: a set of the nodes paired with their sets of edges
+        return hash(frozenset((node, frozenset(edges)) for node, edges in self._outgoing_edges.items()))
 
 
 class HalfEdge:
@@ -250,10 +261,18 @@ class HalfEdge:
     the source node is the key in the hash-table mapped to a list of half edges for
     every edge originating from the key node to the target node of the half-edge.
     """
+    # slots instead of an instance dictionary, as graphs and paths hold many edges
+    __slots__ = ('_node', 'weight', '_hash')
+
     def __init__(self, node, weight=None):
         self._node = node
         self.weight = weight
 
+        # the node is read-only so the hash is computed once
+        h = 13
+        h = 31 * h + hash(node)
+        self._hash = h
+
     @property
     def node(self):
         return self._node
@@ -262,9 +281,7 @@ class HalfEdge:
         return self is other or self.node == other.node
 
     def __hash__(self):
-        h = 13
-        h = 31 * h + hash(self.node)
-        return h
+        return self._hash
 
     def __repr__(self):
         return "-" + ("" if self.weight is None else "[" + str(self.weight) + "]-") + ">" + str(self.node)
@@ -272,22 +289,36 @@ class HalfEdge:
 
 class ToHalfEdge(HalfEdge):
     """A half-edge going towards a node."""
+    __slots__ = ()
+
     def __repr__(self):
         return "-" + ("" if self.weight is None else "[" + str(self.weight) + "]-") + ">" + str(self.node)
 
 
 class FromHalfEdge(HalfEdge):
     """A half-edge originating from a node."""
+    __slots__ = ()
+
     def __repr__(self):
         return str(self.node) + "-" + ("" if self.weight is None else "[" + str(self.weight) + "]-") + ">"
 
 
 class Edge(HalfEdge):
     """A edge from one node to another in a graph, known as tail and head nodes, respectively."""
+    __slots__ = ('_tail',)
+
     def __init__(self, tail, head, weight=None):
         super().__init__(head, weight)
         self._tail = tail
 
+        # edges are used as immutable values (the weight should not be changed once
+        # the edge is created) so the hash is computed once
+        h = 13
+        h = 31 * h + hash(tail)
+        h = 31 * h + hash(head)
+        h = 31 * h + hash(weight)
+        self._hash = h
+
     @property
     def tail(self):
         return self._tail
@@ -303,11 +334,7 @@ class Edge(HalfEdge):
                                  self.weight == other.weight)
 
     def __hash__(self):
-        h = 13
-        h = 31 * h + hash(self.tail)
-        h = 31 * h + hash(self.head)
-        h = 31 * h + hash(self.weight)
-        return h
+        return self._hash
 
     def __repr__(self):
         return str(self.tail) + "-" + ("" if self.weight is None else "[" + str(self.weight) + "]-") + ">" + str(self.head)
@@ -327,13 +354,33 @@ class Path:
     path (the number of edges in it). In this case, a path consisting of a single node has
     cost and length 0.
     """
-    def __init__(self, start_node, cost=None, *half_edges):
+    # slots instead of an instance dictionary, as explorations create a path per edge followed
+    __slots__ = ('start_node', 'last_node', '_parent', '_own_half_edges', '_half_edges', '_length',
+                 '_edges', '_hash', '_cost', '_default_cost')
+
+    def __init__(self, start_node, cost=None, *half_edges, parent=None):
+        """
+        :param parent: An optional path that this path extends with the half_edges. The
+                       half-edges of the parent are shared, rather than copied, by the new
+                       path and only materialized when the full sequence is requested.
+        """
         self.start_node = start_node
-        self.last_node = start_node if len(half_edges) == 0 else half_edges[len(half_edges) - 1].node
-        self._half_edges = half_edges
+        if len(half_edges) > 0:
+            self.last_node = half_edges[len(half_edges) - 1].node
+        else:
+            self.last_node = start_node if parent is None else parent.last_node
+        self._parent = parent
+        self._own_half_edges = half_edges
+        self._half_edges = half_edges if parent is None else None
+        self._length = len(half_edges) if parent is None else len(parent) + len(half_edges)
         self._edges = None
+        self._hash = None
         self._cost = cost
 
+        # whether the cost is computed from the edges (as opposed to being supplied), in
+        # which case it can be carried over incrementally to paths extending this one.
+        self._default_cost = cost is None
+
     @classmethod
     def from_path(cls, path):
         """Creates a copy of the path."""
@@ -344,8 +391,38 @@ class Path:
 
     @property
     def half_edges(self):
+        """
+        The half-edges of the path. For paths built by extension, these are collected
+        by following the parent links on first access.
+        """
+        if self._half_edges is None:
+            segments = []
+            path = self
+            while path._half_edges is None:
+                segments.append(path._own_half_edges)
+                path = path._parent
+            half_edges = list(path._half_edges)
+            for segment in reversed(segments):
+                half_edges.extend(segment)
+            self._half_edges = tuple(half_edges)
         return self._half_edges
 
+    @property
+    def parent(self):
+        """The path without its last half-edge, or None for a path consisting of a single node."""
+        if self._length == 0:
+            return None
+        if self._parent is not None and len(self._own_half_edges) == 1:
+            return self._parent
+        return Path(self.start_node, None, *self.half_edges[:-1])
+
+    @property
+    def last_edge(self):
+        """The last half-edge of the path, or None for a path consisting of a single node."""
+        if len(self._own_half_edges) > 0:
+            return self._own_half_edges[len(self._own_half_edges) - 1]
+        return None if self._parent is None else self._parent.last_edge
+
     @property
     def edges(self):
         """The path as a list of full-edges, constructed on demand."""
@@ -366,39 +443,48 @@ class Path:
         if self._cost is None:
             self._cost = 0
             for edge in self.half_edges:
-                if isinstance(edge.weight, int) or isinstance(edge.weight, float):
-                    self._cost += edge.weight
-                else:
-                    self._cost += 1
+                self._cost += Path._edge_cost(edge)
         return self._cost
 
+    @staticmethod
+    def _edge_cost(edge):
+        """The default cost of an edge: its weight if numeric, 1 otherwise."""
+        return edge.weight if isinstance(edge.weight, int) or isinstance(edge.weight, float) else 1
+
     def extend(self, edge, cost=None):
         """
         Returns a new path consisting of this path extended by the supplied edge.
         :param edge: The edge to extends this path with
         :param cost: The cost of the new path. If this is None the default cost-computation
                      is applied to the new path (sum of weights if numeric, otherwise path-length).
-        :return: The new extended path. The current path is not changed.
+        :return: The new extended path. The current path is not changed; the new path refers
+                 to it as its parent instead of copying its half-edges, making this O(1).
         """
-        new_edges = list(self.half_edges)
-        new_edges.append(edge)
-        return Path(self.start_node, cost, *new_edges)
+        path = Path(self.start_node, cost, edge, parent=self)
+        if cost is None and self._default_cost:
+            path._cost = self.cost + Path._edge_cost(edge)
+        return path
 
     def __getitem__(self, key):
         return self.edges[key]
 
     def __len__(self):
         """The length of a path is the number of edges in it"""
-        return len(self.half_edges)
+        return self._length
 
     def __eq__(self, other):
-        return self is other or (type(self) is type(other) and self.half_edges == other.half_edges)
+        return self is other or (type(self) is type(other)
+                                 and self._length == other._length
+                                 and self.half_edges == other.half_edges)
 
     def __hash__(self):
-        h = 13
-        h = 31 * h + hash(self.start_node)
-        h = 31 * h + hash(self.half_edges)
-        return h
+        # paths are immutable so the hash is computed once, on first use
+        if self._hash is None:
+            h = 13
+            h = 31 * h + hash(self.start_node)
+            h = 31 * h + hash(self.half_edges)
+            self._hash = h
+        return self._hash
 
     def __lt__(self, other):
         return self.cost < other.cost
@@ -7,8 +7,10 @@ author: Vikash Madhow
 """
 
 from Graph import Graph, Path
+from bisect import insort
 from collections import deque
-from heapq import heappush, heappop
+from itertools import count
+from heapq import heappush, heappop, heapify
 
 
 class PathQueue:
@@ -45,6 +47,9 @@ class FifoPathQueue(PathQueue):
     def add(self, node):
         self._nodes.append(node)
 
+    def add_all(self, nodes):
+        self._nodes.extend(nodes)
+
     def pop(self):
         return self._nodes.popleft()
 
@@ -63,11 +68,16 @@ class LifoPathQueue(PathQueue):
     """
     def __init__(self):
         super().__init__()
-        self._nodes = deque()
+        # a stack only grows and shrinks at its end, for which a list is contiguous
+        # storage with cheaper appends and pops than a deque
+        self._nodes = []
 
     def add(self, node):
         self._nodes.append(node)
 
+    def add_all(self, nodes):
+        self._nodes.extend(nodes)
+
     def pop(self):
         return self._nodes.pop()
 
@@ -83,22 +93,183 @@ class PriorityPathQueue(PathQueue):
     A path-queue returning paths in minimum-cost order. Using this path-queue
     in the search and explore functions produces minimum-cost first (greedy)
     exploration behavior.
+
+    Only the cheapest path to any node is kept: a path costing as much as or more than
+    the best path added so far to the same last node is dropped, while a cheaper one
+    replaces it. Replaced paths are left in the heap, marked stale by no longer being
+    the best path to their node, and discarded when they reach the top.
     """
     def __init__(self):
         super().__init__()
+        # heap of (cost, sequence number, path) entries: ties in cost are popped in the order the
+        # paths were added and paths are never compared themselves
         self._nodes = []
+        self._counter = count()
+        # maps the last node of paths added to the cost of the best of those paths and
+        # that path, if still queued (None once popped)
+        self._best = {}
+        self._size = 0
 
     def add(self, node):
-        heappush(self._nodes, node)
+        last_node, cost = node.last_node, node.cost
+        best = self._best.get(last_node)
+        if best is None or cost < best[0]:
+            if best is None or best[1] is None:
+                self._size += 1
+            self._best[last_node] = (cost, node)
+            heappush(self._nodes, (cost, next(self._counter), node))
+
+    def add_all(self, nodes):
+        best, counter = self._best, self._counter
+        added = []
+        for node in nodes:
+            last_node, cost = node.last_node, node.cost
+            node_best = best.get(last_node)
+            if node_best is None or cost < node_best[0]:
+                if node_best is None or node_best[1] is None:
+                    self._size += 1
+                best[last_node] = (cost, node)
+                added.append((cost, next(counter), node))
+
+        # pushing k paths costs O(k log n) against O(n + k) to append them all and restore
+        # the heap property in one pass, so large batches are merged by re-heapifying.
+        heap = self._nodes
+        if len(added) * len(heap).bit_length() > len(heap):
+            heap.extend(added)
+            heapify(heap)
+        else:
+            for entry in added:
+                heappush(heap, entry)
 
     def pop(self):
-        return heappop(self._nodes)
+        cost, _, node = heappop(self._nodes)
+        self._best[node.last_node] = (cost, None)
+        self._size -= 1
+
+        # keep a live path at the top of the heap, if any, so that has_more is exact
+        nodes, best = self._nodes, self._best
+        while nodes and best[nodes[0][2].last_node][1] is not nodes[0][2]:
+            heappop(nodes)
+        return node
 
     def has_more(self):
         return len(self._nodes) > 0
 
     def __len__(self):
-        return len(self._nodes)
+        return self._size
+
+
+class RadixPathQueue(PathQueue):
+    """
+    A path-queue returning paths in minimum-cost order, like the PriorityPathQueue, implemented
+    as a monotone radix heap. Paths are kept in buckets according to the highest bit in which
+    their cost differs from the cost of the last path popped, so adding a path is a single append
+    and paths are only moved between buckets, towards the lowest one, when it runs empty. Paths
+    with the same cost are popped in no particular order.
+
+    This relies on the costs being monotone: no path may be added with a cost lower than that
+    of the last path popped, which holds for the default path cost when edge weights are not
+    negative. Costs are integers; other numeric costs are first scaled by the scale factor and
+    truncated to integers.
+    """
+    def __init__(self, scale=1):
+        super().__init__()
+        self._scale = scale
+        self._buckets = [[]]
+        self._last = 0
+        self._size = 0
+
+    def add(self, node):
+        key = int(node.cost * self._scale)
+        if key < self._last:
+            raise ValueError("Path " + str(node) + " has a lower cost than the last path popped from this "
+                             "radix path-queue; costs must not decrease (edge weights must not be negative)")
+
+        bucket = (key ^ self._last).bit_length()
+        while bucket >= len(self._buckets):
+            self._buckets.append([])
+        self._buckets[bucket].append((key, node))
+        self._size += 1
+
+    def pop(self):
+        buckets = self._buckets
+        if not buckets[0]:
+            # move the paths of the lowest non-empty bucket to lower buckets relative to
+            # their minimum cost, which becomes the last cost and fills the bucket 0.
+            b = 1
+            while not buckets[b]:
+                b += 1
+            entries, buckets[b] = buckets[b], []
+            last = min(entry[0] for entry in entries)
+            for entry in entries:
+                buckets[(entry[0] ^ last).bit_length()].append(entry)
+            self._last = last
+
+        self._size -= 1
+        return buckets[0].pop()[1]
+
+    def has_more(self):
+        return self._size > 0
+
+    def __len__(self):
+        return self._size
+
+
+class BucketPathQueue(PathQueue):
+    """
+    A path-queue returning paths in minimum-cost order, like the PriorityPathQueue, with the
+    paths grouped in buckets of costs delta wide, as in the delta-stepping shortest-path
+    algorithm. Adding a path to a bucket other than the current (lowest) one is a single append,
+    and a bucket is sorted once, when it becomes the current bucket, after which paths added to
+    it are inserted in cost order. Most paths are thus never compared with paths in other buckets,
+    which is most effective when delta is close to the typical edge weight.
+    """
+    def __init__(self, delta=1):
+        super().__init__()
+        self._delta = delta
+        self._buckets = {}
+        # the keys of the non-empty buckets other than the current one, in a heap
+        self._keys = []
+        self._current_key = None
+        self._current = []
+        # the position of the next path to pop in the current bucket
+        self._pos = 0
+        self._size = 0
+
+    def add(self, node):
+        key = int(node.cost // self._delta)
+        current_key = self._current_key
+        if current_key is not None and key <= current_key:
+            # paths cheaper than the current bucket can only come from decreasing costs, and
+            # go before the paths remaining in the current bucket, which is where insort puts them.
+            insort(self._current, node, self._pos)
+        else:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._buckets[key] = [node]
+                heappush(self._keys, key)
+            else:
+                bucket.append(node)
+        self._size += 1
+
+    def pop(self):
+        if self._pos == len(self._current):
+            self._current_key = heappop(self._keys)
+            self._current = self._buckets.pop(self._current_key)
+            self._current.sort()
+            self._pos = 0
+
+        node = self._current[self._pos]
+        self._current[self._pos] = None
+        self._pos += 1
+        self._size -= 1
+        return node
+
+    def has_more(self):
+        return self._size > 0
+
+    def __len__(self):
+        return self._size
 
 
 # Graph exploration functions and objects
@@ -161,33 +332,50 @@ def explore(graph, start_node, path_queue, explore_op, accumulator=None,
              explore_op function returning any result (other than the
              DONT_FOLLOW_THIS_PATH constant).
     """
-    explored = set()
+    path_queue.add(Path(start_node))
 
-    def _explore():
-        while path_queue.has_more():
-            path = path_queue.pop()
-            frontier = path.last_node
-            if frontier not in explored:
-                explored.add(frontier)
-                result = explore_op(graph, path, accumulator)
-                if result is None:
-                    successors = expand_op(graph, path)
-                    if successors is not None:
-                        for edge in filter(lambda e: e.node not in explored, successors):
-                            path_queue.add(
-                                path.extend(edge,
-                                            None if path_cost_op is None else path_cost_op(graph, path, edge)))
+    # the loops below run once per path explored: methods and constants used by them are
+    # bound to local variables, which are faster to access than attributes and globals.
+    has_more, pop, add_all = path_queue.has_more, path_queue.pop, path_queue.add_all
+    dont_follow = DONT_FOLLOW_THIS_PATH
 
-                elif result is DONT_FOLLOW_THIS_PATH:
-                    continue
+    explored = set()
+    explored_add = explored.add
+
+    # searches for a node compare the nodes reached with the goal node, without calling the explore_op
+    node_search = type(explore_op) is _NodeSearch
+    goal_node = explore_op.goal_node if node_search else None
+
+    # with the default expansion, the outgoing edges are read from the graph directly; they are read
+    # afresh on every expansion, so changes made to the graph during the exploration are followed.
+    outgoing_edges = graph.outgoing_edges if expand_op is default_path_expansion else None
+
+    while has_more():
+        path = pop()
+        frontier = path.last_node
+        if frontier not in explored:
+            explored_add(frontier)
+            if node_search:
+                if frontier == goal_node:
+                    return path
+                result = None
+            else:
+                result = explore_op(graph, path, accumulator)
 
+            if result is None:
+                successors = expand_op(graph, path) if outgoing_edges is None else outgoing_edges(frontier)
+                if successors is None:
+                    pass
+                elif path_cost_op is None:
+                    add_all([path.extend(edge) for edge in successors if edge.node not in explored])
                 else:
-                    return result
-        else:
-            return None
+                    add_all([path.extend(edge, path_cost_op(graph, path, edge))
+                             for edge in successors if edge.node not in explored])
 
-    path_queue.add(Path(start_node))
-    return _explore()
+            elif result is not dont_follow:
+                return result
+
+    return None
 
 
 def breadth_first_explore(graph, start_node, explore_op, accumulator=None, expand_op=default_path_expansion):
@@ -200,9 +388,16 @@ def depth_first_explore(graph, start_node, explore_op, accumulator=None, expand_
     return explore(graph, start_node, LifoPathQueue(), explore_op, accumulator, expand_op)
 
 
-def min_cost_first_explore(graph, start_node, explore_op, accumulator=None, expand_op=default_path_expansion):
-    """Explores the graph, taking minimum costs path first"""
-    return explore(graph, start_node, PriorityPathQueue(), explore_op, accumulator, expand_op)
+def min_cost_first_explore(graph, start_node, explore_op, accumulator=None, expand_op=default_path_expansion,
+                           path_queue=None, delta=None):
+    """
+    Explores the graph, taking minimum costs path first. The minimum-cost path_queue to use
+    defaults to a PriorityPathQueue, or to a BucketPathQueue with buckets delta wide if delta is
+    provided; a RadixPathQueue is faster for non-negative integer weights.
+    """
+    if path_queue is None:
+        path_queue = PriorityPathQueue() if delta is None else BucketPathQueue(delta)
+    return explore(graph, start_node, path_queue, explore_op, accumulator, expand_op)
 
 
 def search(graph, start_node, path_queue, goal_op, expand_op=default_path_expansion, path_cost_op=None):
@@ -224,8 +419,11 @@ def search(graph, start_node, path_queue, goal_op, expand_op=default_path_expans
     :return: The path from the start_node to a goal node (as defined by the goal_op) or
              None if no such path is found.
     """
-    def search_explore_op(graph, path, accumulator):
-        return path if goal_op(graph, path) else None
+    if type(goal_op) is _NodeMatch:
+        search_explore_op = _NodeSearch(goal_op.goal_node)
+    else:
+        def search_explore_op(graph, path, accumulator):
+            return path if goal_op(graph, path) else None
 
     return explore(graph, start_node, path_queue, search_explore_op, None, expand_op, path_cost_op)
 
@@ -240,9 +438,11 @@ def depth_first_search(graph, start_node, goal_op, expand_op=default_path_expans
     return search(graph, start_node, LifoPathQueue(), goal_op, expand_op, path_cost_op)
 
 
-def min_cost_search(graph, start_node, goal_op, expand_op=default_path_expansion, path_cost_op=None):
-    """Minimum-cost (greedy) search"""
-    return search(graph, start_node, PriorityPathQueue(), goal_op, expand_op, path_cost_op)
+def min_cost_search(graph, start_node, goal_op, expand_op=default_path_expansion, path_cost_op=None,
+                    path_queue=None):
+    """Minimum-cost (greedy) search, with a path_queue as for min_cost_first_explore."""
+    path_queue = PriorityPathQueue() if path_queue is None else path_queue
+    return search(graph, start_node, path_queue, goal_op, expand_op, path_cost_op)
 
 
 def match_node(goal_node):
@@ -255,7 +455,29 @@ def match_node(goal_node):
     :param goal_node: The goal node that this goal_op will match with.
     :return: The goal_op function for matching the supplied goal_node.
     """
-    return lambda graph, path: path.last_node == goal_node
+    return _NodeMatch(goal_node)
+
+
+class _NodeMatch:
+    """The goal_op returned by match_node(), recognized by search()."""
+    def __init__(self, goal_node):
+        self.goal_node = goal_node
+
+    def __call__(self, graph, path):
+        return path.last_node == self.goal_node
+
+
+class _NodeSearch:
+    """
+    The explore_op used by search() for a goal_op returned by match_node(), returning the first
+    path to the goal node. explore() compares the nodes reached with the goal node itself
+    instead of calling it.
+    """
+    def __init__(self, goal_node):
+        self.goal_node = goal_node
+
+    def __call__(self, graph, path, accumulator):
+        return path if path.last_node == self.goal_node else None
 
 
 # Simple tree-growing algorithms
@@ -267,18 +489,13 @@ def spanning_tree(graph, start_node, path_queue, expand_op=default_path_expansio
     function have the same meaning as in GraphExplore.explore() function.
     """
     def grow_tree(g, path, tree):
-        path_length = len(path)
-        if path_length == 0:
+        last_edge = path.last_edge
+        if last_edge is None:
             tree[path.start_node] = set()
 
-        elif path_length == 1:
-            last_edge = path.half_edges[0]
-            tree.setdefault(path.start_node, set()).add(last_edge.__class__(last_edge.node, last_edge.weight))
-
         else:
-            last_edge = path.half_edges[path_length - 1]
-            tree.setdefault(path.half_edges[path_length - 2].node, set()).add(
-                last_edge.__class__(last_edge.node, last_edge.weight))
+            # half-edges are not changed once created, so the tree shares those of the graph
+            tree.setdefault(path.parent.last_node, set()).add(last_edge)
 
     t = {}
     explore(graph, start_node, path_queue, grow_tree, t, expand_op, path_cost_op)
@@ -295,9 +512,11 @@ def depth_first_spanning_tree(graph, start_node, expand_op=default_path_expansio
     return spanning_tree(graph, start_node, LifoPathQueue(), expand_op, path_cost_op)
 
 
-def min_cost_spanning_tree(graph, start_node, expand_op=default_path_expansion, path_cost_op=None):
-    """Minimum-cost tree, equivalent to Prim's algorithm"""
-    return spanning_tree(graph, start_node, PriorityPathQueue(), expand_op, path_cost_op)
+def min_cost_spanning_tree(graph, start_node, expand_op=default_path_expansion, path_cost_op=None,
+                           path_queue=None):
+    """Minimum-cost tree, equivalent to Prim's algorithm, with a path_queue as for min_cost_first_explore."""
+    path_queue = PriorityPathQueue() if path_queue is None else path_queue
+    return spanning_tree(graph, start_node, path_queue, expand_op, path_cost_op)
 
 
 def main():
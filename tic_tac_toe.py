@@ -1,3 +1,15 @@
+from array import array
+
+# The positions on each row, column and diagonal of the board as bit masks, with
+# the position at (row, col) corresponding to the bit row * 3 + col.
+WIN_MASKS = (0b000_000_111, 0b000_111_000, 0b111_000_000,   # horizontals
+             0b001_001_001, 0b010_010_010, 0b100_100_100,   # verticals
+             0b100_010_001, 0b001_010_100)                  # diagonals
+
+# The powers of 3 by position: a board is indexed by the base-3 number whose digit for the
+# position (row, col), at the power row * 3 + col, is the value in that position.
+POW3 = tuple(3 ** pos for pos in range(9))
+
 
 class Board:
 
@@ -6,13 +18,20 @@ class Board:
 
     def __init__(self, size=3):
         self.size = 3;
-        self._positions = [[Board.BLANK for _ in range(size)] for _ in range(size)]
+        # the value in each position, the position (row, col) being at row * 3 + col
+        self._positions = bytearray(9)
+        # the base-3 index of the board, maintained as positions are set
+        self._index = 0
 
     def __setitem__(self, key, value):
         if Board.BLANK <= value <= Board.O:
             row, col = key
             if 0 <= row < self.size and 0 <= col < self.size:
-                self._positions[row][col] = value
+                pos = row * 3 + col
+                old_value = self._positions[pos]
+                # written first, as the bytearray rejects non-integer values
+                self._positions[pos] = value
+                self._index += (value - old_value) * POW3[pos]
             else:
                 raise IndexError("Only row and column positions must be between 0 and " + str(self.size - 1) + " are valid")
         else:
@@ -21,33 +40,46 @@ class Board:
     def __getitem__(self, key):
         row, col = key
         if 0 <= row <= 2 and 0 <= col <= 2:
-            return self._positions[row][col]
+            return self._positions[row * 3 + col]
         else:
             raise IndexError("Only row and column positions must be between 0 and " + str(self.size - 1) + " are valid")
 
     @staticmethod
     def other_player(player):
-        return Board.O if player == Board.X else Board.O
+        return Board.O if player == Board.X else Board.X
 
     def value(self, player):
-        # check horizontals
-        for row in range(self.size):
-            if all([self[row, col] == player for col in range(self.size)]):
-                return Board.WON
+        if player != Board.X and player != Board.O:
+            raise ValueError("Only X(1) and O(2) are valid players")
+        return VALUES[player][self._index]
+
+    def evaluate(self):
+        """The value of the board for X: WON if X has a line, LOST if O has, 0 otherwise."""
+        return VALUES[Board.X][self._index]
 
-        # check verticals
-        for col in range(self.size):
-            if all([self[row, col] == player for row in range(self.size)]):
-                return Board.WON
 
-        # check forward diagonal
-        if all([self[pos, pos] == player for pos in range(self.size)]):
-            return Board.WON
+def _board_values():
+    """
+    Computes the value of every possible board for each player, indexed by player and then by the
+    base-3 index of the board.
+    """
+    x_values, o_values = array('b', bytes(3 ** 9)), array('b', bytes(3 ** 9))
+    for index in range(3 ** 9):
+        x_bits = o_bits = 0
+        digits = index
+        for pos in range(9):
+            digits, value = divmod(digits, 3)
+            if value == Board.X:
+                x_bits |= 1 << pos
+            elif value == Board.O:
+                o_bits |= 1 << pos
 
-        # check backward diagonal
-        if all([self[pos, self.size - pos - 1] == player for pos in range(self.size)]):
-            return Board.WON
+        x_won = any(x_bits & mask == mask for mask in WIN_MASKS)
+        o_won = any(o_bits & mask == mask for mask in WIN_MASKS)
+        x_values[index] = Board.WON if x_won else Board.LOST if o_won else 0
+        o_values[index] = Board.WON if o_won else Board.LOST if x_won else 0
+    return None, x_values, o_values
 
-        if self.value(self, Board.other_player(player)) == Board.WON:
-            return Board.LOST
 
+# The value of the board for each player (X=1, O=2), by board index.
+VALUES = _board_values()